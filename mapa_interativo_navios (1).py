@@ -7,27 +7,51 @@ Desenvolvido com Folium para visualização interativa de dados de navegação
 import pandas as pd
 import folium
 from folium import plugins
+from branca.colormap import LinearColormap
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import gzip
 import json
+import multiprocessing
+import os
+
+try:
+    # orjson serializa o JSON embutido no HTML bem mais rápido que o json padrão
+    import orjson
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+except ImportError:
+    def json_dumps(obj):
+        return json.dumps(obj)
 
 
 #CARREGAR E PROCESSAR DADOS
 
 print("Carregando dados do CSV combinado...")
-df = pd.read_csv('/home/ubuntu/Uploads/consumo_combinado.csv')
+try:
+    # Parser multi-thread do PyArrow: muito mais rápido que o parser padrão
+    df = pd.read_csv('/home/ubuntu/Uploads/consumo_combinado.csv', engine='pyarrow')
+except ImportError:
+    df = pd.read_csv('/home/ubuntu/Uploads/consumo_combinado.csv')
 
 # Converter DATAHORA para datetime
 df['DATAHORA'] = pd.to_datetime(df['DATAHORA'])
 
-# Remover duplicatas baseadas em timestamp, lat, lon e nome
-df = df.drop_duplicates(subset=['NOME', 'DATAHORA', 'LATITUDE', 'LONGITUDE'])
+# Colunas com poucos valores distintos viram categóricas: deduplicação,
+# ordenação, filtros e groupbys operam sobre códigos inteiros, não strings
+for col in ['NOME', 'eventName', 'sessionId']:
+    df[col] = df[col].astype('category')
 
-# Ordenar por nome e data
-df = df.sort_values(['NOME', 'DATAHORA']).reset_index(drop=True)
+# Remover duplicatas (timestamp, lat, lon e nome) e valores NaN numa
+# única máscara booleana: o DataFrame é filtrado e copiado uma vez só,
+# em vez de uma cópia por etapa da cadeia anterior
+manter = (~df.duplicated(subset=['NOME', 'DATAHORA', 'LATITUDE', 'LONGITUDE'])
+          & df[['LATITUDE', 'LONGITUDE', 'VELOCIDADE', 'RUMO']].notna().all(axis=1))
 
-# Limpar valores NaN
-df = df.dropna(subset=['LATITUDE', 'LONGITUDE', 'VELOCIDADE', 'RUMO'])
+# Ordenar por nome e data
+df = df[manter].sort_values(['NOME', 'DATAHORA']).reset_index(drop=True)
 
 print(f"Total de pontos únicos: {len(df)}")
 print(f"Navios: {df['NOME'].unique()}")
@@ -37,76 +61,241 @@ print(f"Período: {df['DATAHORA'].min()} até {df['DATAHORA'].max()}")
 # FUNÇÕES AUXILIARES
 
 
-def velocidade_para_cor(velocidade, v_min, v_max):
-    """Converte velocidade em cor do espectro verde-amarelo-vermelho"""
+def velocidades_para_cores(velocidades, v_min, v_max):
+    """Converte um array de velocidades em cores hex do espectro
+    verde-amarelo-vermelho numa única passada NumPy"""
+    velocidades = np.asarray(velocidades, dtype=np.float64)
     if v_max == v_min:
-        return '#00ff00'  # verde se todas velocidades iguais
-    
+        return np.full(len(velocidades), '#00ff00')
+
     # Normalizar entre 0 e 1
-    norm = (velocidade - v_min) / (v_max - v_min)
-    
-    if norm < 0.5:
-        # Verde para Amarelo
-        r = int(255 * (norm * 2))
-        g = 255
-        b = 0
-    else:
-        # Amarelo para Vermelho
-        r = 255
-        g = int(255 * (2 - norm * 2))
-        b = 0
-    
-    return f'#{r:02x}{g:02x}{b:02x}'
-
-def criar_icone_seta(angulo, cor):
-    """Cria um ícone SVG de seta rotacionada"""
-    svg = f'''
-    <svg width="30" height="30" xmlns="http://www.w3.org/2000/svg">
-        <g transform="rotate({angulo} 15 15)">
-            <path d="M15 5 L20 20 L15 17 L10 20 Z" fill="{cor}" stroke="black" stroke-width="1"/>
-        </g>
-    </svg>
-    '''
-    return svg
-
-def criar_popup_html(row):
-    """Cria HTML para popup com informações do ponto"""
-    html = f"""
+    norm = (velocidades - v_min) / (v_max - v_min)
+
+    # Verde -> Amarelo (norm < 0.5) e Amarelo -> Vermelho (norm >= 0.5)
+    r = np.where(norm < 0.5, norm * 2 * 255, 255).astype(np.uint32)
+    g = np.where(norm < 0.5, 255, (2 - norm * 2) * 255).astype(np.uint32)
+
+    # Empacotar RGB em um uint24 (azul é sempre 0) e formatar de uma vez
+    packed = (r << 16) | (g << 8)
+    return np.array(['#%06x' % p for p in packed])
+
+def simplificar_trajetoria(lats, lons, tolerancia=1e-4):
+    """Douglas-Peucker iterativo: retorna os índices dos pontos a manter.
+
+    tolerancia em graus (1e-4 ≈ 11 m); pontos cujo desvio perpendicular à
+    corda é menor que isso não mudam a forma visível da linha."""
+    n = len(lats)
+    if n < 3:
+        return np.arange(n)
+
+    manter = np.zeros(n, dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, n - 1)]
+
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2:
+            continue
+
+        # Distância perpendicular dos pontos intermediários à corda ini-fim
+        x0, y0 = lons[ini], lats[ini]
+        x1, y1 = lons[fim], lats[fim]
+        xs = lons[ini + 1:fim]
+        ys = lats[ini + 1:fim]
+        dx, dy = x1 - x0, y1 - y0
+        comprimento = np.hypot(dx, dy)
+        if comprimento == 0:
+            dist = np.hypot(xs - x0, ys - y0)
+        else:
+            dist = np.abs(dy * xs - dx * ys + x1 * y0 - y1 * x0) / comprimento
+
+        pior = int(np.argmax(dist))
+        if dist[pior] > tolerancia:
+            idx = ini + 1 + pior
+            manter[idx] = True
+            pilha.append((ini, idx))
+            pilha.append((idx, fim))
+
+    return np.flatnonzero(manter)
+
+def filtrar_pontos_proximos(lats, lons, raio=5e-5):
+    """Retorna os índices dos pontos a manter, descartando duplicatas
+    visuais: pontos a menos de `raio` graus (~5 m) de um ponto já mantido.
+
+    Usa cKDTree do SciPy quando disponível; sem ele, agrupa por células de
+    grade do mesmo tamanho e mantém o primeiro ponto de cada célula."""
+    n = len(lats)
+    if n < 2:
+        return np.arange(n)
+
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        celulas = np.stack([np.floor(lats / raio), np.floor(lons / raio)], axis=1)
+        _, primeiros = np.unique(celulas, axis=0, return_index=True)
+        return np.sort(primeiros)
+
+    pontos = np.column_stack([lats, lons])
+    arvore = cKDTree(pontos)
+    manter = np.ones(n, dtype=bool)
+    # Varredura gulosa: cada ponto mantido descarta os vizinhos seguintes
+    # dentro do raio; pontos empilhados custam uma única consulta, sem
+    # enumerar os O(N²) pares do aglomerado
+    for i in range(n):
+        if not manter[i]:
+            continue
+        for j in arvore.query_ball_point(pontos[i], raio):
+            if j > i:
+                manter[j] = False
+    return np.flatnonzero(manter)
+
+# Template do popup montado uma única vez no nível do módulo; cada ponto
+# só preenche os campos via str.format
+POPUP_TEMPLATE = """
     <div style="font-family: Arial; font-size: 12px; min-width: 200px;">
-        <h4 style="margin: 0 0 10px 0; color: #2c3e50;">{row['NOME']}</h4>
+        <h4 style="margin: 0 0 10px 0; color: #2c3e50;">{nome}</h4>
         <table style="width: 100%; border-collapse: collapse;">
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Data/Hora:</td>
-                <td style="padding: 5px;">{row['DATAHORA'].strftime('%Y-%m-%d %H:%M:%S')}</td>
+                <td style="padding: 5px;">{datahora}</td>
             </tr>
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Velocidade:</td>
-                <td style="padding: 5px;">{row['VELOCIDADE']:.1f} km/h</td>
+                <td style="padding: 5px;">{velocidade:.1f} km/h</td>
             </tr>
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Rumo:</td>
-                <td style="padding: 5px;">{row['RUMO']:.1f}°</td>
+                <td style="padding: 5px;">{rumo:.1f}°</td>
             </tr>
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Latitude:</td>
-                <td style="padding: 5px;">{row['LATITUDE']:.6f}</td>
+                <td style="padding: 5px;">{lat:.6f}</td>
             </tr>
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Longitude:</td>
-                <td style="padding: 5px;">{row['LONGITUDE']:.6f}</td>
+                <td style="padding: 5px;">{lon:.6f}</td>
             </tr>
             <tr style="border-bottom: 1px solid #ddd;">
                 <td style="padding: 5px; font-weight: bold;">Evento:</td>
-                <td style="padding: 5px;">{row['eventName']}</td>
+                <td style="padding: 5px;">{evento}</td>
             </tr>
             <tr>
                 <td style="padding: 5px; font-weight: bold;">Session ID:</td>
-                <td style="padding: 5px; font-size: 10px;">{row['sessionId']}</td>
+                <td style="padding: 5px; font-size: 10px;">{session_id}</td>
             </tr>
         </table>
     </div>
     """
-    return html
+
+def criar_popup_html(nome, datahora, velocidade, rumo, lat, lon, evento, session_id):
+    """Cria HTML para popup com informações do ponto (datahora já formatada)"""
+    return POPUP_TEMPLATE.format(
+        nome=nome, datahora=datahora, velocidade=velocidade, rumo=rumo,
+        lat=lat, lon=lon, evento=evento, session_id=session_id)
+
+def processar_navio(navio, df_navio, v_min, v_max):
+    """Prepara todos os dados de um navio: features GeoJSON dos pontos,
+    registros para o JSON de filtros, linha simplificada e primeiro EM PORTO.
+
+    Função de nível de módulo para poder rodar num ProcessPoolExecutor;
+    devolve apenas estruturas picklable — a montagem das camadas folium
+    fica no processo principal, onde o mapa vive."""
+    df_navio = df_navio.copy()
+
+    # Encontrar primeiro evento "EM PORTO" (equivalente a DOCAGEM):
+    # argmax sobre a máscara booleana acha a primeira ocorrência sem
+    # materializar um DataFrame filtrado
+    primeiro_porto = None
+    mascara_porto = (df_navio['eventName'] == 'EM PORTO').to_numpy()
+    if mascara_porto.any():
+        row_porto = df_navio.iloc[int(np.argmax(mascara_porto))]
+        primeiro_porto = {
+            'lat': float(row_porto['LATITUDE']),
+            'lon': float(row_porto['LONGITUDE']),
+            'nome': str(row_porto['NOME']),
+            'datahora': row_porto['DATAHORA'].strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    # Cores baseadas na velocidade, calculadas uma única vez para todos os
+    # pontos e reusadas nos marcadores e no JSON
+    cores = velocidades_para_cores(df_navio['VELOCIDADE'].to_numpy(), v_min, v_max)
+
+    # Extrair as colunas como ndarrays uma única vez: iterar com zip evita
+    # a construção de uma Series por linha feita pelo iterrows()
+    lat_arr = df_navio['LATITUDE'].to_numpy()
+    lon_arr = df_navio['LONGITUDE'].to_numpy()
+    vel_arr = df_navio['VELOCIDADE'].to_numpy()
+    rumo_arr = df_navio['RUMO'].to_numpy()
+    # Timestamps formatados de uma vez com .dt.strftime em vez de um
+    # strftime por linha dentro do loop
+    datahora_str_arr = df_navio['DATAHORA'].dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    datahora_min_arr = df_navio['DATAHORA'].dt.strftime('%Y-%m-%d %H:%M').to_numpy()
+    evento_arr = df_navio['eventName'].to_numpy()
+    sessao_arr = df_navio['sessionId'].to_numpy()
+
+    # Dados para JSON montados de uma vez com to_dict(orient='records'),
+    # em vez de um dicionário construído à mão por linha dentro do loop
+    pontos_dados = pd.DataFrame({
+        'lat': lat_arr,
+        'lon': lon_arr,
+        'datahora': datahora_str_arr,
+        'velocidade': vel_arr.astype(float),
+        'rumo': rumo_arr.astype(float),
+        'evento': evento_arr,
+        'sessionId': sessao_arr.astype(str),
+        'cor': cores
+    }).to_dict(orient='records')
+
+    # Descartar duplicatas visuais na camada de marcadores: pontos quase
+    # coincidentes (navio parado) viram um marcador só; o JSON de filtros
+    # continua com todos os pontos
+    idx_visiveis = filtrar_pontos_proximos(lat_arr, lon_arr)
+    ponto_visivel = np.zeros(len(df_navio), dtype=bool)
+    ponto_visivel[idx_visiveis] = True
+
+    coordenadas = []
+    features_pontos = []
+
+    for i, (lat, lon, velocidade, rumo, datahora_str, datahora_min, evento, sessao) in enumerate(
+            zip(lat_arr, lon_arr, vel_arr, rumo_arr,
+                datahora_str_arr, datahora_min_arr, evento_arr, sessao_arr)):
+        coordenadas.append([float(lat), float(lon)])
+
+        if not ponto_visivel[i]:
+            continue
+
+        # Feature GeoJSON do ponto: todos os pontos viram uma única camada
+        # Leaflet em vez de N CircleMarkers independentes
+        features_pontos.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [float(lon), float(lat)]},
+            'properties': {
+                'cor': cores[i],
+                'popup': criar_popup_html(navio, datahora_str, velocidade, rumo, lat, lon, evento, sessao),
+                'tooltip': f"{datahora_min} - {velocidade:.1f} km/h"
+            }
+        })
+
+    # Simplificar a geometria da linha com Douglas-Peucker antes de
+    # plotar: menos segmentos serializados sem mudar a forma visível
+    coords_linha = []
+    vels_linha = []
+    if len(coordenadas) > 1:
+        idx_linha = simplificar_trajetoria(lat_arr, lon_arr)
+        coords_linha = [coordenadas[j] for j in idx_linha]
+        vels_linha = [float(v) for v in vel_arr[idx_linha][:-1]]
+
+    return {
+        'navio': navio,
+        'features_pontos': features_pontos,
+        'pontos_dados': pontos_dados,
+        'coords_linha': coords_linha,
+        'vels_linha': vels_linha,
+        'primeiro_porto': primeiro_porto,
+        'session_ids': [str(s) for s in df_navio['sessionId'].unique()],
+        'total_pontos': len(df_navio),
+        'pontos_visiveis': int(len(idx_visiveis))
+    }
 
 
 #CRIAR MAPA BASE
@@ -138,135 +327,126 @@ navios = df['NOME'].unique()
 v_min = df['VELOCIDADE'].min()
 v_max = df['VELOCIDADE'].max()
 
+# Colormap verde-amarelo-vermelho na mesma escala global de velocidades
+colormap_velocidade = LinearColormap(['#00ff00', '#ffff00', '#ff0000'],
+                                     vmin=v_min, vmax=v_max)
+
 # Preparar dados para JSON (para filtros JavaScript)
 dados_json = {}
 
-for navio in navios:
+# Preparação por navio em processos paralelos: cada worker recebe o
+# sub-DataFrame do seu navio (um único groupby, sem varreduras repetidas)
+# e devolve estruturas picklable; as camadas folium são montadas aqui
+grupos = list(df.groupby('NOME', sort=False))
+
+if len(grupos) > 1:
+    # Forçar o start method fork: com spawn (padrão no macOS e no Linux a
+    # partir do Python 3.14) cada worker reimportaria este módulo e
+    # reexecutaria o script inteiro, já que não há guarda __main__
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('fork')) as executor:
+        futuros = [executor.submit(processar_navio, navio, df_navio, v_min, v_max)
+                   for navio, df_navio in grupos]
+        resultados = [futuro.result() for futuro in futuros]
+else:
+    resultados = [processar_navio(navio, df_navio, v_min, v_max)
+                  for navio, df_navio in grupos]
+
+for resultado in resultados:
+    navio = resultado['navio']
     print(f"\nProcessando: {navio}")
-    df_navio = df[df['NOME'] == navio].copy()
-    
+
     # Criar feature group para este navio
     fg_navio = folium.FeatureGroup(name=navio, show=True)
-    
-    # Preparar coordenadas e dados para a trajetória
-    coordenadas = []
-    pontos_dados = []
-    
-    # Encontrar primeiro evento "EM PORTO" (equivalente a DOCAGEM)
-    primeiro_porto_idx = None
-    df_porto = df_navio[df_navio['eventName'] == 'EM PORTO']
-    if len(df_porto) > 0:
-        primeiro_porto_idx = df_porto.index[0]
-    
-    
-    # ADICIONAR PONTOS E SETAS
-    
-    for idx, row in df_navio.iterrows():
-        lat, lon = row['LATITUDE'], row['LONGITUDE']
-        coordenadas.append([lat, lon])
-        
-        # Cor baseada na velocidade
-        cor = velocidade_para_cor(row['VELOCIDADE'], v_min, v_max)
-        
-        # Dados para JSON
-        pontos_dados.append({
-            'lat': lat,
-            'lon': lon,
-            'datahora': row['DATAHORA'].strftime('%Y-%m-%d %H:%M:%S'),
-            'velocidade': float(row['VELOCIDADE']),
-            'rumo': float(row['RUMO']),
-            'evento': row['eventName'],
-            'sessionId': str(row['sessionId']),
-            'cor': cor
-        })
-        
-        # Adicionar marcador circular pequeno em cada ponto
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=3,
-            popup=folium.Popup(criar_popup_html(row), max_width=300),
-            tooltip=f"{row['DATAHORA'].strftime('%Y-%m-%d %H:%M')} - {row['VELOCIDADE']:.1f} km/h",
-            color=cor,
-            fill=True,
-            fillColor=cor,
-            fillOpacity=0.8,
-            weight=2
+
+    if resultado['pontos_visiveis'] < resultado['total_pontos']:
+        print(f"  Marcadores deduplicados: {resultado['total_pontos']} -> "
+              f"{resultado['pontos_visiveis']} pontos")
+
+    # ADICIONAR PONTOS
+
+    # Adicionar todos os marcadores circulares como uma única camada GeoJson
+    if resultado['features_pontos']:
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': resultado['features_pontos']},
+            marker=folium.CircleMarker(radius=3, fill=True),
+            style_function=lambda feature: {
+                'color': feature['properties']['cor'],
+                'fillColor': feature['properties']['cor'],
+                'fillOpacity': 0.8,
+                'weight': 2
+            },
+            tooltip=folium.GeoJsonTooltip(fields=['tooltip'], labels=False),
+            popup=folium.GeoJsonPopup(fields=['popup'], labels=False, max_width=300)
         ).add_to(fg_navio)
-        
-        # Adicionar seta a cada N pontos para não poluir
-        if len(df_navio) > 50:
-            intervalo = len(df_navio) // 30  # Máximo 30 setas
-        else:
-            intervalo = 2
-            
-        if idx % intervalo == 0 or idx == df_navio.index[-1]:
-            # Criar marcador com seta customizada
-            icon_html = f'''
-            <div style="transform: rotate({row['RUMO']}deg); transform-origin: center;">
-                <svg width="30" height="30" xmlns="http://www.w3.org/2000/svg">
-                    <path d="M15 5 L20 20 L15 17 L10 20 Z" fill="{cor}" stroke="black" stroke-width="1.5"/>
-                </svg>
-            </div>
-            '''
-            folium.Marker(
-                location=[lat, lon],
-                icon=folium.DivIcon(html=icon_html),
-                tooltip=f"Rumo: {row['RUMO']:.1f}°"
-            ).add_to(fg_navio)
-    
-    
-    # ADICIONAR LINHA DE TRAJETÓRIA
-    
-    # Criar segmentos coloridos da linha
-    for i in range(len(coordenadas) - 1):
-        cor = velocidade_para_cor(pontos_dados[i]['velocidade'], v_min, v_max)
-        folium.PolyLine(
-            locations=[coordenadas[i], coordenadas[i+1]],
-            color=cor,
+
+
+    # ADICIONAR LINHA DE TRAJETÓRIA E SETAS
+
+    # Linha única multi-segmento colorida por velocidade, em vez de um
+    # PolyLine independente por segmento
+    coords_linha = resultado['coords_linha']
+    if len(coords_linha) > 1:
+        if len(coords_linha) < resultado['total_pontos']:
+            print(f"  Linha simplificada: {resultado['total_pontos']} -> "
+                  f"{len(coords_linha)} pontos")
+
+        folium.ColorLine(
+            positions=coords_linha,
+            colors=resultado['vels_linha'],
+            colormap=colormap_velocidade,
             weight=3,
-            opacity=0.7,
-            tooltip=f"Velocidade: {pontos_dados[i]['velocidade']:.1f} km/h"
+            opacity=0.7
         ).add_to(fg_navio)
-    
-    
+
+        # Setas de direção: uma única camada de texto repetido ao longo da
+        # trajetória, no lugar de um Marker DivIcon rotacionado por ponto
+        linha_setas = folium.PolyLine(coords_linha, weight=0, opacity=0)
+        linha_setas.add_to(fg_navio)
+        plugins.PolyLineTextPath(
+            linha_setas,
+            '       ➤       ',
+            repeat=True,
+            offset=7,
+            attributes={'fill': '#2c3e50', 'font-size': '18'}
+        ).add_to(fg_navio)
+
+
     #  ADICIONAR ÍCONE DE ÂNCORA
-    
-    if primeiro_porto_idx is not None:
-        row_porto = df_navio.loc[primeiro_porto_idx]
-        
+
+    porto = resultado['primeiro_porto']
+    if porto is not None:
         # Ícone de âncora customizado
         ancora_html = '''
         <div style="font-size: 30px; color: #2c3e50; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);">
             ⚓
         </div>
         '''
-        
+
         folium.Marker(
-            location=[row_porto['LATITUDE'], row_porto['LONGITUDE']],
+            location=[porto['lat'], porto['lon']],
             icon=folium.DivIcon(html=ancora_html),
             popup=folium.Popup(f"""
             <div style="font-family: Arial; font-size: 12px;">
                 <h4 style="margin: 0 0 10px 0; color: #2c3e50;">⚓ Primeiro EM PORTO</h4>
-                <p><b>Navio:</b> {row_porto['NOME']}</p>
-                <p><b>Data/Hora:</b> {row_porto['DATAHORA'].strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p><b>Localização:</b> {row_porto['LATITUDE']:.6f}, {row_porto['LONGITUDE']:.6f}</p>
+                <p><b>Navio:</b> {porto['nome']}</p>
+                <p><b>Data/Hora:</b> {porto['datahora']}</p>
+                <p><b>Localização:</b> {porto['lat']:.6f}, {porto['lon']:.6f}</p>
             </div>
             """, max_width=300),
             tooltip="⚓ Primeiro evento EM PORTO"
         ).add_to(fg_navio)
-        
-        print(f"  ⚓ Âncora adicionada em: {row_porto['DATAHORA']}")
-    
+
+        print(f"  ⚓ Âncora adicionada em: {porto['datahora']}")
+
     # Adicionar feature group ao mapa
     fg_navio.add_to(mapa)
-    
+
     # Salvar dados para JSON
-    dados_json[navio] = pontos_dados
-    
+    dados_json[navio] = resultado['pontos_dados']
+
     # Informações do session ID
-    session_ids = df_navio['sessionId'].unique()
-    print(f"  Session IDs: {session_ids}")
-    print(f"  Total de pontos: {len(df_navio)}")
+    print(f"  Session IDs: {resultado['session_ids']}")
+    print(f"  Total de pontos: {resultado['total_pontos']}")
 
 
 #  ADICIONAR LEGENDA
@@ -316,12 +496,11 @@ legenda_html = f'''
         <div style="font-size: 11px; margin-top: 5px; max-height: 100px; overflow-y: auto;">
 '''
 
-# Adicionar session IDs únicos
+# Adicionar session IDs únicos (agrupados numa passada só)
+sessoes_por_navio = df.groupby('NOME', sort=False)['sessionId'].unique()
 for navio in navios:
-    df_navio = df[df['NOME'] == navio]
-    session_ids = df_navio['sessionId'].unique()
     legenda_html += f'<b>{navio}:</b><br/>'
-    for sid in session_ids:
+    for sid in sessoes_por_navio[navio]:
         legenda_html += f'• {sid}<br/>'
 
 legenda_html += '''
@@ -445,8 +624,8 @@ filtros_html += f'''
 
 <script>
 // Dados dos navios em JSON
-var dadosNavios = {json.dumps(dados_json)};
-var naviosDisponiveis = {json.dumps(list(navios))};
+var dadosNavios = {json_dumps(dados_json)};
+var naviosDisponiveis = {json_dumps(list(navios))};
 
 // Função para encontrar e controlar os layers dos navios
 function controlarLayersNavios(navioSelecionado) {{
@@ -549,6 +728,25 @@ output_file = '/home/ubuntu/mapa_navios_interativo.html'
 print(f"\nSalvando mapa em: {output_file}")
 mapa.save(output_file)
 
+# Pré-comprimir o HTML: o servidor pode entregar o .gz/.br direto com
+# Content-Encoding, sem comprimir a cada requisição
+with open(output_file, 'rb') as f:
+    html_bytes = f.read()
+
+with gzip.open(output_file + '.gz', 'wb', compresslevel=9) as f:
+    f.write(html_bytes)
+print(f"Versão gzip: {output_file}.gz "
+      f"({len(html_bytes)} -> {os.path.getsize(output_file + '.gz')} bytes)")
+
+try:
+    import brotli
+    with open(output_file + '.br', 'wb') as f:
+        f.write(brotli.compress(html_bytes))
+    print(f"Versão brotli: {output_file}.br "
+          f"({os.path.getsize(output_file + '.br')} bytes)")
+except ImportError:
+    pass
+
 print("\n" + "="*60)
 print("✅ MAPA INTERATIVO CRIADO COM SUCESSO!")
 print("="*60)